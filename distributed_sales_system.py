@@ -9,6 +9,7 @@ import time
 import logging
 import numpy as np
 import struct
+import os
 
 # -----------------------
 # Config
@@ -17,6 +18,12 @@ DB_NAME = "sales_analysis.db"
 HOST = "0.0.0.0"
 PORT = 5000
 CHUNKS_PER_WORKER = 10
+DEFAULT_DATA_FILE = "sales_data_5m.csv"
+PARQUET_SUFFIXES = (".parquet", ".parq", ".pq")
+# Seconds a worker keeps retrying while the server starts (SALES_CONNECT_TIMEOUT overrides)
+CONNECT_TIMEOUT = 60
+# Only these columns are used by the workers; float so blank cells load as NaN
+DATA_DTYPES = {"Price": np.float64, "Quantity": np.float64}
 
 logging.basicConfig(level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s")
@@ -161,9 +168,18 @@ class DatabaseManager:
 # -----------------------
 # Server
 # -----------------------
+def read_csv_columns(path):
+    """Read the needed columns, preferring pyarrow's multithreaded CSV reader"""
+    kwargs = dict(usecols=list(DATA_DTYPES), dtype=DATA_DTYPES)
+    try:
+        return pd.read_csv(path, engine="pyarrow", **kwargs)
+    except (ImportError, ValueError):
+        # pyarrow missing or too old, or pandas < 1.4 without the engine
+        return pd.read_csv(path, engine="c", **kwargs)
+
 class SalesDataServer:
-    def __init__(self, csv_file, num_workers):
-        self.csv_file = csv_file
+    def __init__(self, data_file, num_workers):
+        self.data_file = data_file
         self.num_workers = num_workers
         self.db = DatabaseManager()
         self.start_time = None
@@ -171,7 +187,14 @@ class SalesDataServer:
         self.dataset_rows = 0
 
     def split_data(self):
-        df = pd.read_csv(self.csv_file)
+        if self.data_file.lower().endswith(PARQUET_SUFFIXES):
+            # Columnar file: only the needed columns are read from disk
+            try:
+                df = pd.read_parquet(self.data_file, columns=list(DATA_DTYPES)).astype(DATA_DTYPES)
+            except ImportError as e:
+                raise ImportError(f"Reading {self.data_file} needs pyarrow or fastparquet: {e}") from e
+        else:
+            df = read_csv_columns(self.data_file)
         self.dataset_rows = len(df)
         logging.info(f"Dataset loaded: {self.dataset_rows} rows")
         total_chunks = self.num_workers * CHUNKS_PER_WORKER
@@ -198,12 +221,15 @@ class SalesDataServer:
         logging.info(f"Worker {worker_id} finished")
 
     def start(self):
-        self.split_data()
-        self.start_time = time.time()
+        # Fail on a missing/unreadable file before any worker can connect
+        open(self.data_file, "rb").close()
+        # Listen before loading data so workers can connect (and queue) right away
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.bind((HOST, PORT))
         server_socket.listen(self.num_workers)
         logging.info(f"Server started on {HOST}:{PORT}, waiting for {self.num_workers} workers...")
+        self.split_data()
+        self.start_time = time.time()
 
         threads = []
         for i in range(self.num_workers):
@@ -221,7 +247,13 @@ class SalesDataServer:
 # Worker
 # -----------------------
 def process_chunk(df, worker_id):
-    sales_amount = (df["Price"] * df["Quantity"]).sum()
+    # Dot product over the float64 columns without copying them; only if a
+    # NaN shows up, redo it with nansum so missing rows are skipped like Series.sum()
+    price = df["Price"].to_numpy(dtype=np.float64, copy=False)
+    quantity = df["Quantity"].to_numpy(dtype=np.float64, copy=False)
+    sales_amount = np.dot(price, quantity)
+    if np.isnan(sales_amount):
+        sales_amount = np.nansum(price * quantity)
     return {
         "worker_id": worker_id,
         "rows_processed": len(df),
@@ -232,14 +264,42 @@ def process_chunk(df, worker_id):
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
     }
 
+def connect_timeout():
+    value = os.environ.get("SALES_CONNECT_TIMEOUT")
+    if not value:
+        return CONNECT_TIMEOUT
+    try:
+        return float(value)
+    except ValueError:
+        logging.warning(f"Invalid SALES_CONNECT_TIMEOUT {value!r}, using {CONNECT_TIMEOUT}s")
+        return CONNECT_TIMEOUT
+
+def connect_to_server(timeout=None):
+    """Connect to the server, retrying until it is listening"""
+    if timeout is None:
+        timeout = connect_timeout()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return socket.create_connection((HOST, PORT))
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+
 def start_worker():
     worker_id = f"Worker-{int(time.time())}"
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.connect((HOST, PORT))
+    sock = connect_to_server()
     logging.info(f"{worker_id} connected, waiting for chunks...")
 
     while True:
-        chunk = recv_msg(sock)
+        try:
+            chunk = recv_msg(sock)
+        except ConnectionError:
+            chunk = None
+        if chunk is None:
+            logging.error(f"{worker_id} lost connection to server (did it fail to load the data?)")
+            break
         if isinstance(chunk, str) and chunk == "STOP":
             logging.info(f"{worker_id} received STOP signal, exiting.")
             break
@@ -249,23 +309,47 @@ def start_worker():
     sock.close()
     logging.info(f"{worker_id} closed connection.")
 
+def default_num_workers():
+    """Usable CPUs minus one left for the server"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS/Windows
+        cpus = os.cpu_count() or 1
+    return max(1, cpus - 1)
+
 # -----------------------
 # Entry Point
 # -----------------------
+def usage():
+    print("Usage:")
+    print("  python distributed_sales_system.py server <num_workers|auto> [data_file]")
+    print("  python distributed_sales_system.py worker")
+    print(f"  'auto' = usable CPUs - 1 (here {default_num_workers()}); "
+          f"data_file defaults to {DEFAULT_DATA_FILE}")
+    sys.exit(1)
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage:")
-        print("  python distributed_sales_system.py server <num_workers>")
-        print("  python distributed_sales_system.py worker")
-        sys.exit(1)
+        usage()
 
     mode = sys.argv[1]
     if mode == "server":
-        if len(sys.argv) < 3:
-            print("Usage: python distributed_sales_system.py server <num_workers>")
-            sys.exit(1)
-        num_workers = int(sys.argv[2])
-        server = SalesDataServer("sales_data_5m.csv", num_workers)
+        args = sys.argv[2:]
+        if not 1 <= len(args) <= 2:
+            usage()
+        if args[0] == "auto":
+            num_workers = default_num_workers()
+            logging.info(f"num_workers auto: {num_workers} (usable CPUs - 1); "
+                         f"start {num_workers} workers")
+        else:
+            try:
+                num_workers = int(args[0])
+            except ValueError:
+                usage()
+            if num_workers < 1:
+                usage()
+        data_file = args[1] if len(args) > 1 else DEFAULT_DATA_FILE
+        server = SalesDataServer(data_file, num_workers)
         server.start()
     elif mode == "worker":
         start_worker()